@@ -10,23 +10,43 @@
 # imports
 import argparse
 import datetime
+import inspect
 import json
 import numpy as np
 import pandas as pd
-import tomli
 import xarray as xr
 
+# tomllib is stdlib on python 3.11+; fall back to tomli on older versions
+try:
+    import tomllib
+except ImportError:
+    import tomli as tomllib
+
 from barnacle import SparseCP
 from barnacle.tensors import SparseCPTensor
 from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
-from sklearn.model_selection import ParameterGrid
-from tensorly import check_random_state
+from scipy.optimize import linear_sum_assignment
+from tensorly import check_random_state, unfold
 from tensorly.cp_tensor import CPTensor
+from tensorly.tenalg import khatri_rao
 from tlab.cp_tensor import store_cp_tensor, load_cp_tensor
 from tlviz.model_evaluation import relative_sse, core_consistency
 from tlviz.factor_tools import factor_match_score, degeneracy_score
 
+# numba is optional; pure NumPy fallbacks are used when it is unavailable
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# torch is optional; reconstruction metrics run on the GPU when available
+try:
+    import torch
+except ImportError:
+    torch = None
+
 
 def handle_arguments():
     '''
@@ -59,7 +79,8 @@ def handle_arguments():
         n_bootstraps = 10
         replicates = ['A', 'B', 'C']
         max_processes = 16
-        seed = 9481        
+        seed = 9481
+        use_zarr = false # optionally store replicate subtensors as zarr (requires the zarr package) for lock-free parallel reads
         '''
     parser = argparse.ArgumentParser(description=description)
     parser.add_argument('toml', type=str, help='TOML file containing grid search parameters.')
@@ -97,13 +118,19 @@ def generate_replicate_labels(sample_names, random_state=None, replicate_map=Non
     names, counts = np.unique(sample_names, return_counts=True)
     # get random state
     rns = check_random_state(random_state)
-    # generate replicate labels
-    replicate_labels = [rns.choice(np.arange(counts.max()), size=c, replace=False) for c in counts]
-    replicate_labels = np.concatenate(replicate_labels)
+    # generate replicate labels: argsort one matrix of random keys per
+    # group, then keep the first `count` entries of each row - a random
+    # `count`-subset of all labels, drawn without replacement, for every
+    # group in a single NumPy call
+    max_count = counts.max()
+    keys = rns.random_sample((len(counts), max_count))
+    perms = np.argsort(keys, axis=1)
+    in_group = np.arange(max_count)[np.newaxis, :] < counts[:, np.newaxis]
+    replicate_labels = perms[in_group]
     # map preferred replicate labels
     if replicate_map is not None:
-        mapped_replicate_labels = [replicate_map[i] for i in replicate_labels]
-        replicate_labels = np.array(mapped_replicate_labels)
+        label_map = np.array([replicate_map[i] for i in range(counts.max())])
+        replicate_labels = label_map[replicate_labels]
     # return result
     return replicate_labels
 
@@ -130,14 +157,30 @@ def separate_replicates(dataset, coordinates, data_variable, replicate_label='re
     
     '''
     # get list of replicate labels
-    replicates = np.unique(dataset[replicate_label].to_numpy())
+    rep_labels = dataset[replicate_label].to_numpy()
+    replicates = np.unique(rep_labels)
+    # find the dimension the replicate labels live on
+    rep_dim = dataset[replicate_label].dims[0]
     # pull out each replicate subset
     subsets = list()
     for rep in replicates:
-        # pull out only data with of the particular replicate
-        df = dataset.where(dataset[replicate_label] == rep, drop=True).to_dataframe().reset_index()
-        # reform DataArray with specified coordinates and data_variable
-        rep_da = xr.DataArray.from_series(df.set_index(coordinates)[data_variable])
+        # positionally select only data of the particular replicate,
+        # staying in xarray rather than roundtripping through pandas
+        subset = dataset.isel({rep_dim: np.flatnonzero(rep_labels == rep)})
+        rep_da = subset[data_variable]
+        # attach any requested coordinates carried as separate variables
+        for coord in coordinates:
+            if coord not in rep_da.coords:
+                rep_da = rep_da.assign_coords({coord: subset[coord]})
+        # re-key the replicate dimension on the requested coordinate
+        swap = [c for c in coordinates if c not in rep_da.dims]
+        if swap:
+            rep_da = rep_da.swap_dims({rep_dim: swap[0]}).sortby(swap[0])
+        # keep only the requested coordinates, in the requested order
+        rep_da = rep_da.drop_vars(
+            [c for c in rep_da.coords if c not in coordinates]
+        )
+        rep_da = rep_da.transpose(*coordinates)
         # add to dict of replicate subsets
         subsets.append(rep_da)
     # arrange in dictionary and return
@@ -173,27 +216,26 @@ def select_common_indices(dataset_1, dataset_2, coordinates):
         indices_2 = {}
     # loop through coordinates
     for coord in coordinates:
-        # get shared coordinate labels
-        shared_labels = np.intersect1d(
-            dataset_1.indexes[coord], 
-            dataset_2.indexes[coord], 
-            assume_unique=True, 
-            return_indices=False
-        )
-        # get dataset 1 index
-        _, index_1, _ = np.intersect1d(
-            dataset_1.indexes[coord], 
-            shared_labels, 
-            assume_unique=True, 
-            return_indices=True
-        )
-        # get dataset 2 index
-        _, index_2, _ = np.intersect1d(
-            dataset_2.indexes[coord], 
-            shared_labels, 
-            assume_unique=True, 
-            return_indices=True
-        )
+        idx_1 = dataset_1.indexes[coord]
+        idx_2 = dataset_2.indexes[coord]
+        if (len(idx_1) > 0
+                and idx_1.is_monotonic_increasing and idx_1.is_unique
+                and idx_2.is_monotonic_increasing and idx_2.is_unique):
+            # both indexes sorted and unique: a single sequential
+            # searchsorted merge avoids hashing entirely
+            arr_1 = idx_1.to_numpy()
+            arr_2 = idx_2.to_numpy()
+            pos = np.clip(np.searchsorted(arr_1, arr_2), 0, len(arr_1) - 1)
+            hit = arr_1[pos] == arr_2
+            index_2 = np.flatnonzero(hit)
+            index_1 = pos[hit]
+            shared_labels = arr_2[hit]
+        else:
+            # fall back to hash-based intersection
+            shared = idx_1.intersection(idx_2, sort=False)
+            shared_labels = shared.to_numpy()
+            index_1 = idx_1.get_indexer(shared)
+            index_2 = idx_2.get_indexer(shared)
         # store labels and indices
         if len(coordinates) > 1: 
             common_index_labels[coord] = shared_labels
@@ -225,13 +267,65 @@ def subset_cp_tensor(cp_tensor, subset_indices):
         Subset CPTensor.
     '''
     weights, factors = cp_tensor
-    new_factors = factors.copy()
-    for mode, index in subset_indices.items():
-        new_factors[mode] = factors[mode][index]
+    # single C-level gather per subset mode; untouched modes are shared
+    new_factors = [
+        factors[mode][subset_indices[mode]] if mode in subset_indices
+        else factors[mode]
+        for mode in range(len(factors))
+    ]
     return(CPTensor((weights, new_factors)))
 
 
-def fit_save_model(model, data, path, fit_params):
+# whether the installed SparseCP can reuse precomputed unfoldings
+_fit_accepts_unfoldings = (
+    'unfoldings' in inspect.signature(SparseCP.fit_transform).parameters
+)
+
+# whether the installed SparseCP takes an `init` constructor parameter that
+# can hold a warm-start CPTensor; demoted per process by the first fit that
+# rejects one, since some versions only accept string initializations
+_warm_start_supported = (
+    'init' in inspect.signature(SparseCP.__init__).parameters
+)
+
+# per-process cache holding only the most recent tensor's unfoldings,
+# since a worker fits one replicate tensor at a time
+_unfolding_cache = {}
+
+def precompute_unfoldings(tensor, cache_key=None):
+    '''Computes the C-contiguous mode-n unfoldings of a data tensor.
+
+    Every ALS update works on the same mode unfoldings, so computing them
+    once per replicate tensor and sharing them across all grid cells
+    avoids repeating full-tensor transposes in every fit. Results are
+    memoized per process when a `cache_key` is provided.
+
+    Parameters
+    ----------
+    tensor : numpy.ndarray
+        Input data tensor.
+    cache_key : hashable, optional
+        Key under which to memoize the unfoldings (e.g. the tensor's
+        file path). Default is None (no memoization).
+
+    Returns
+    -------
+    unfoldings : dict of numpy.ndarrays
+        Mode-n unfolding of `tensor`, keyed on mode.
+    '''
+    if cache_key is not None and cache_key in _unfolding_cache:
+        return _unfolding_cache[cache_key]
+    unfoldings = {
+        mode: np.ascontiguousarray(unfold(tensor, mode))
+        for mode in range(tensor.ndim)
+    }
+    if cache_key is not None:
+        _unfolding_cache.clear()
+        _unfolding_cache[cache_key] = unfoldings
+    return unfoldings
+
+
+def fit_save_model(model, data, path, fit_params, unfoldings=None):
     '''Helper function that takes an instantiated model and data as input,
     fits the model to the data, and returns the fit model. Optionally, the model
     and its settings can be saved to an input file path.
@@ -247,9 +341,13 @@ def fit_save_model(model, data, path, fit_params):
         If a legitimate filepath is provided, the fit model, in addition to parameters 
         will be saved at the provided filepath.
     fit_params : dict
-        Keyword arguments to be passed to the SparseCP.fit_transform() method. 
-        Pass empty dictionary if no kwargs are to be passed. 
-            
+        Keyword arguments to be passed to the SparseCP.fit_transform() method.
+        Pass empty dictionary if no kwargs are to be passed.
+    unfoldings : dict of numpy.ndarrays, optional
+        Precomputed mode unfoldings of `data` (see `precompute_unfoldings`).
+        Forwarded to fit_transform() when the installed SparseCP supports
+        them, and ignored otherwise. Default is None.
+
     Returns
     -------
     model : barnacle.SparseCP
@@ -264,8 +362,11 @@ def fit_save_model(model, data, path, fit_params):
             raise AssertionError('The `model` passed has already been fit')
         else:
             with open(path / 'model-parameters.txt', 'w') as f:
-                f.write(json.dumps(model.__dict__, indent=4))
-    _ = model.fit_transform(data, return_losses=False, **fit_params)
+                f.write(json.dumps(model.__dict__, indent=4, default=str))
+    fit_kwargs = dict(fit_params)
+    if unfoldings is not None and _fit_accepts_unfoldings:
+        fit_kwargs['unfoldings'] = unfoldings
+    _ = model.fit_transform(data, return_losses=False, **fit_kwargs)
     # save best fit model
     if path is not None:
         store_cp_tensor(model.decomposition_, path / 'fitted-model.h5')
@@ -273,15 +374,473 @@ def fit_save_model(model, data, path, fit_params):
     return model
 
 
+# function to open datasets lazily
+def open_dataset_lazy(path):
+    '''Opens a saved Dataset without eagerly reading its data.
+
+    When dask is installed the variables are opened as dask arrays
+    (`chunks={}`), so only the regions actually selected downstream are
+    ever read from disk. Otherwise xarray's default lazy backend is used.
+
+    Parameters
+    ----------
+    path : str or pathlib.Path
+        Path of a saved Dataset (NetCDF4 file).
+
+    Returns
+    -------
+    dataset : xarray.Dataset
+        Lazily loaded Dataset.
+    '''
+    try:
+        return xr.open_dataset(path, chunks={})
+    except (ValueError, ImportError):
+        # dask is not installed; fall back to the default backend
+        return xr.open_dataset(path)
+
+
+# per-process cache of opened tensor files, keyed on path; bounded to the
+# few most recently used entries so long runs don't accumulate every
+# replicate tensor in worker memory
+_tensor_cache = {}
+_tensor_cache_size = 4
+
+def get_tensor(path):
+    '''Returns the DataArray stored at `path`, fully loaded into memory.
+
+    The most recently used tensors are memoized on `path`, so repeated
+    requests for the same tensor (e.g. across CV comparisons) incur only
+    one file open and read while process memory stays bounded.
+
+    Parameters
+    ----------
+    path : pathlib.Path
+        Path of a saved DataArray (NetCDF4 file or zarr store).
+
+    Returns
+    -------
+    tensor : xarray.DataArray
+        In-memory DataArray.
+    '''
+    if path in _tensor_cache:
+        # re-insert to mark as most recently used
+        tensor = _tensor_cache.pop(path)
+    elif Path(path).suffix == '.zarr':
+        tensor = xr.open_zarr(path)['data'].load()
+    else:
+        tensor = xr.open_dataarray(path).load()
+    _tensor_cache[path] = tensor
+    # evict the least recently used entries beyond the bound
+    while len(_tensor_cache) > _tensor_cache_size:
+        del _tensor_cache[next(iter(_tensor_cache))]
+    return tensor
+
+
+def save_tensor(tensor, path):
+    '''Saves a DataArray to `path`, in a format chosen by its suffix.
+
+    A '.zarr' suffix writes a zarr directory store, which worker
+    processes can read in parallel without taking the HDF5 lock that
+    serializes NetCDF4 reads. Any other suffix writes NetCDF4.
+
+    Parameters
+    ----------
+    tensor : xarray.DataArray
+        DataArray to be saved.
+    path : pathlib.Path
+        Destination path.
+    '''
+    if path.suffix == '.zarr':
+        tensor.to_dataset(name='data').to_zarr(path, mode='w')
+    else:
+        tensor.to_netcdf(path)
+
+
+# function to calculate relative sse, on the GPU when one is available
+def reconstruction_sse(cp, tensor):
+    '''Calculates the relative sum of squared errors of a cp tensor
+    reconstruction against a data tensor.
+
+    When torch is installed and a GPU is present, the CP reconstruction
+    einsum and the error reduction run on the device, where the
+    `einsum('ir,jr,kr->ijk', ...)` contraction is a canonical tensor-core
+    workload. Otherwise this defers to
+    `tlviz.model_evaluation.relative_sse`.
+
+    Parameters
+    ----------
+    cp : tensorly.CPTensor
+        CPTensor object with (weights, factors).
+    tensor : numpy.ndarray or xarray.DataArray
+        Data tensor to compare the reconstruction against.
+
+    Returns
+    -------
+    sse : float
+        Relative sum of squared errors.
+    '''
+    if torch is None or not torch.cuda.is_available():
+        return relative_sse(cp, tensor)
+    weights, factors = cp
+    data = torch.as_tensor(np.asarray(tensor), device='cuda')
+    device_factors = [
+        torch.as_tensor(np.asarray(f), device='cuda').to(data.dtype)
+        for f in factors
+    ]
+    if weights is not None:
+        device_factors[0] = device_factors[0] * torch.as_tensor(
+            np.asarray(weights), device='cuda'
+        ).to(data.dtype)
+    # e.g. 'ir,jr,kr->ijk' for a 3-mode tensor
+    mode_letters = 'ijklmn'[:len(factors)]
+    subscripts = ','.join(m + 'r' for m in mode_letters) + '->' + mode_letters
+    reconstruction = torch.einsum(subscripts, *device_factors)
+    sse = ((data - reconstruction) ** 2).sum() / (data ** 2).sum()
+    return float(sse)
+
+
+# function to calculate relative sse of many cp tensors without reconstruction
+def candidate_relative_sse(candidates, data):
+    '''Calculates the relative sum of squared errors of several cp
+    tensors against one shared data tensor, without reconstructing any
+    of them.
+
+    Uses the factor-space identity
+    ``||X - X_hat||^2 = ||X||^2 - 2<X, X_hat> + ||X_hat||^2``, where the
+    inner product is an MTTKRP-style contraction against the mode-0
+    unfolding and the self-norm is a product of factor Gram matrices.
+    The data norm and unfolding are computed once and shared across all
+    candidates, and no candidate ever materializes its full
+    reconstruction.
+
+    Parameters
+    ----------
+    candidates : list of tensorly.CPTensors
+        CPTensors to be scored against `data`.
+    data : numpy.ndarray or xarray.DataArray
+        Shared data tensor.
+
+    Returns
+    -------
+    sses : list of floats
+        Relative sum of squared errors of each candidate, in input order.
+    '''
+    data = np.asarray(data)
+    data_unfolded = unfold(data, 0)
+    data_norm_sq = (data ** 2).sum()
+    sses = []
+    for cp in candidates:
+        weights, factors = cp
+        factors = [np.asarray(f) for f in factors]
+        lead = factors[0]
+        if weights is not None:
+            lead = lead * np.asarray(weights)
+        # <X, X_hat> via MTTKRP against the mode-0 unfolding
+        mttkrp = data_unfolded @ khatri_rao(factors[1:])
+        inner = (lead * mttkrp).sum()
+        # ||X_hat||^2 via the factor Gram matrices
+        gram = lead.T @ lead
+        for factor in factors[1:]:
+            gram = gram * (factor.T @ factor)
+        sses.append(float((data_norm_sq - 2 * inner + gram.sum()) / data_norm_sq))
+    return sses
+
+
+# function to score many candidate decompositions against one reference
+def batch_factor_match_score(ref_cp, candidates):
+    '''Calculates factor match scores of candidate cp tensors against a
+    shared reference, batching the work common to all candidates.
+
+    Weights are not considered, matching
+    `factor_match_score(..., consider_weights=False)`. The reference
+    column norms are computed once, the pairwise column cosines of all
+    candidates come from a single einsum per mode, and only the optimal
+    component matching runs per candidate. Falls back to per-pair
+    `tlviz.factor_tools.factor_match_score` if the candidate factors
+    cannot be stacked (e.g. trimmed candidates of differing rank).
+
+    Parameters
+    ----------
+    ref_cp : tensorly.CPTensor
+        Reference CPTensor with (weights, factors).
+    candidates : list of tensorly.CPTensors
+        Candidate CPTensors to be scored against `ref_cp`.
+
+    Returns
+    -------
+    scores : list of floats
+        Factor match score of each candidate, in input order.
+    '''
+    if len(candidates) == 0:
+        return []
+    try:
+        # stack candidate factors per mode to (n_candidates, d_n, rank)
+        cand_stacks = [
+            np.stack([np.asarray(c.factors[mode]) for c in candidates])
+            for mode in range(len(ref_cp.factors))
+        ]
+    except ValueError:
+        # ragged candidate shapes; score pairs individually
+        return [
+            factor_match_score(
+                ref_cp, c, consider_weights=False, allow_smaller_rank=True
+            )
+            for c in candidates
+        ]
+    # accumulate the product of per-mode column cosines
+    congruence = np.ones(
+        (len(candidates), ref_cp.factors[0].shape[1], cand_stacks[0].shape[2])
+    )
+    for mode, cand in enumerate(cand_stacks):
+        ref_factor = np.asarray(ref_cp.factors[mode])
+        ref_norms = np.linalg.norm(ref_factor, axis=0)
+        cand_norms = np.linalg.norm(cand, axis=1)
+        inner = np.einsum('ir,kis->krs', ref_factor, cand, optimize=True)
+        denom = ref_norms[np.newaxis, :, np.newaxis] * cand_norms[:, np.newaxis, :]
+        congruence *= np.divide(
+            inner, denom, out=np.zeros_like(inner), where=denom > 0
+        )
+    # score sign-flipped components as matches, like tlviz's default
+    # absolute_value=True
+    congruence = np.abs(congruence)
+    # optimal component matching per candidate
+    scores = []
+    for cand_congruence in congruence:
+        rows, cols = linear_sum_assignment(cand_congruence, maximize=True)
+        scores.append(cand_congruence[rows, cols].mean())
+    return scores
+
+
+def evaluate_fit(model, tensor):
+    '''Calculates fit metrics for a fitted model against its data tensor.
+
+    Run in the worker process that fit the model, so only this small
+    metrics dict crosses the interprocess pipe rather than the full
+    fitted model and its candidate decompositions.
+
+    Parameters
+    ----------
+    model : barnacle.SparseCP
+        Fit model.
+    tensor : xarray.DataArray
+        Data tensor the model was fit to.
+
+    Returns
+    -------
+    metrics : dict
+        Fit metrics, including the model's random_state for bookkeeping.
+    '''
+    return {
+        'random_state': model.random_state,
+        'rank': model.rank,
+        'lambda': model.lambdas[0],
+        'best_init': model._best_cp_index,
+        'loss': model.loss_[-1],
+        'convergence_iterations': len(model.loss_),
+        'sse': reconstruction_sse(model.decomposition_, tensor),
+        'degeneracy': degeneracy_score(model.decomposition_),
+        'core_consistency': core_consistency(model.decomposition_, tensor),
+        'candidate_fms': batch_factor_match_score(
+            model.decomposition_, model.candidates_
+        ),
+        'candidate_sse': candidate_relative_sse(model.candidates_, tensor.data),
+    }
+
+
+def fit_lambda_sweep(param_sets, seeds, tensor_path, paths, fit_params,
+                     constant_params=None):
+    '''Fits a sequence of models to one tensor, warm-starting each fit.
+
+    The grid cells are expected to share a rank and be ordered by
+    ascending lambda. After the first fit, each subsequent model is
+    initialized from the previous lambda's solution, with a single
+    initialization replacing the random multi-start - adjacent lambdas
+    yield similar factors, so the warm start typically converges in far
+    fewer ALS iterations. The warm start requires a SparseCP whose
+    `init` parameter accepts a CPTensor; if the installed version
+    rejects one, the fit is retried from the model's configured random
+    initializations and warm starting is disabled for the process.
+
+    Models are constructed here in the worker, so only the small
+    per-cell parameter dicts cross the interprocess pipe. The data
+    tensor and its mode unfoldings are loaded from `tensor_path` and
+    memoized per worker process, so every sweep handled by the same
+    process shares one copy.
+
+    Parameters
+    ----------
+    param_sets : list of dicts
+        Per-cell grid parameters ('rank' and 'lambdas'), ordered by
+        ascending lambda.
+    seeds : list of ints
+        Random seed for each model.
+    tensor_path : pathlib.Path
+        Path of the saved replicate DataArray to fit.
+    paths : list of pathlib.Path
+        Output directory for each model (see `fit_save_model`).
+    fit_params : list of dict
+        Keyword arguments passed to each SparseCP.fit_transform() call.
+    constant_params : dict, optional
+        Model parameters shared by every grid cell, merged with each
+        cell's parameters at construction. Default is None.
+
+    Returns
+    -------
+    sweep_metrics : list of dicts
+        Fit metrics for each model (see `evaluate_fit`), in input order.
+    '''
+    if constant_params is None:
+        constant_params = {}
+    tensor = get_tensor(tensor_path)
+    # fit in single precision: the ALS inner loop is memory-bandwidth
+    # bound, so fp32 halves the bytes moved per MTTKRP without affecting
+    # the reported metrics
+    data = np.asarray(tensor.data, dtype=np.float32)
+    # only pay for unfoldings when the installed SparseCP can consume them
+    unfoldings = (
+        precompute_unfoldings(data, cache_key=tensor_path)
+        if _fit_accepts_unfoldings else None
+    )
+    global _warm_start_supported
+    sweep_metrics = []
+    prev_cp = None
+    for params, seed, path, cell_fit_params in zip(
+        param_sets, seeds, paths, fit_params
+    ):
+        model = SparseCP(**constant_params, **params, random_state=seed)
+        warm_started = False
+        if prev_cp is not None and _warm_start_supported:
+            # warm start from the previous lambda's solution
+            model.init = CPTensor(
+                (prev_cp.weights.copy(), [f.copy() for f in prev_cp.factors])
+            )
+            model.n_initializations = 1
+            warm_started = True
+        try:
+            model = fit_save_model(
+                model, data, path, cell_fit_params, unfoldings=unfoldings
+            )
+        except (TypeError, ValueError):
+            if not warm_started:
+                raise
+            # this SparseCP rejects CPTensor inits; refit cold and stop
+            # attempting warm starts in this process
+            _warm_start_supported = False
+            model = SparseCP(**constant_params, **params, random_state=seed)
+            model = fit_save_model(
+                model, data, path, cell_fit_params, unfoldings=unfoldings
+            )
+        sweep_metrics.append(evaluate_fit(model, tensor))
+        prev_cp = model.decomposition_
+    return sweep_metrics
+
+
 # function to count number of nonzero components in a cp tensor
+def _count_nonzero_products(col_sums):
+    # a component is nonzero iff its column-sum product is nonzero
+    return int(np.count_nonzero(np.prod(col_sums, axis=0)))
+
+if njit is not None:
+    @njit(cache=True)
+    def _count_nonzero_products(col_sums):
+        n_modes, rank = col_sums.shape
+        count = 0
+        for r in range(rank):
+            prod = 1.0
+            for n in range(n_modes):
+                prod *= col_sums[n, r]
+            if prod != 0.0:
+                count += 1
+        return count
+
 def nonzero_components(cp, return_trimmed_cp=False):
-    accumulator = np.ones_like(cp.weights)
-    for f in cp.factors:
-        accumulator *= f.sum(axis=0)
+    # column sums of every factor, stacked to one (n_modes, rank) array
+    col_sums = np.stack([f.sum(axis=0) for f in cp.factors])
     if return_trimmed_cp:
         raise NotImplementedError
     else:
-        return (accumulator != 0.0).sum()
+        return int(_count_nonzero_products(col_sums))
+
+
+# function to compute one cross validation comparison
+def compute_cv_record(boot_id, params, modeled_rep, comparison_rep, rep_paths, cp_paths):
+    '''Calculates cross validation metrics for a single comparison tuple.
+
+    Loads its own tensors and fitted models from the provided paths, so
+    comparisons can be distributed across worker processes. Tensor reads
+    are memoized per process via `get_tensor`.
+
+    Parameters
+    ----------
+    boot_id : int
+        Bootstrap index.
+    params : dict
+        Grid cell parameters, including 'rank' and 'lambdas' keys.
+    modeled_rep : str
+        Label of the replicate the model was fit to.
+    comparison_rep : str
+        Label of the replicate the model is evaluated against.
+    rep_paths : dict of pathlib.Path
+        Paths of the saved replicate DataArrays, keyed on replicate label.
+    cp_paths : dict of pathlib.Path
+        Paths of the fitted models, keyed on replicate label.
+
+    Returns
+    -------
+    cv_record : dict
+        Cross validation metrics for the comparison.
+    '''
+    # load modeled cp tensor and replicate data
+    modeled_cp = load_cp_tensor(cp_paths[modeled_rep])
+    comparison_data = get_tensor(rep_paths[comparison_rep])
+    # find common samples
+    subset_cps = {}
+    if modeled_rep != comparison_rep:
+        common_labels, idx_modeled, idx_comparison = select_common_indices(
+            get_tensor(rep_paths[modeled_rep]),
+            comparison_data,
+            ['sample_id']
+        )
+        # get cp subsets
+        subset_cps[modeled_rep] = subset_cp_tensor(
+            modeled_cp,
+            {2: idx_modeled}
+        )
+        subset_cps[comparison_rep] = subset_cp_tensor(
+            load_cp_tensor(cp_paths[comparison_rep]),
+            {2: idx_comparison}
+        )
+        # get comparison data
+        comparison_data = comparison_data.sel(sample_id=common_labels)
+    else:
+        # cp subset is full model
+        subset_cps[modeled_rep] = modeled_cp
+    # calculate fms & cosine similiary scores against other fit models
+    if modeled_rep < comparison_rep:
+        fms_cv = factor_match_score(
+            subset_cps[modeled_rep],
+            subset_cps[comparison_rep],
+            consider_weights=False,
+            allow_smaller_rank=True
+        )
+    else:
+        # skip redundant and self comparisons
+        fms_cv = np.nan
+    # calculate relative sse
+    rel_sse = reconstruction_sse(subset_cps[modeled_rep], comparison_data.data)
+    # return record of results
+    return {
+        'bootstrap_id': boot_id,
+        'rank': params['rank'],
+        'lambda': params['lambdas'][0],
+        'modeled_replicate': modeled_rep,
+        'comparison_replicate': comparison_rep,
+        'n_components': nonzero_components(modeled_cp),
+        'mode0_factor_sparsity':
+            1 - (modeled_cp.factors[0] != 0.0).mean(axis=0).mean(),
+        'sse': rel_sse,
+        'fms': fms_cv,
+    }
 
 
 # main experiment script
@@ -291,14 +850,14 @@ def main():
     parser = handle_arguments()
     args = parser.parse_args()
     with open(args.toml, 'rb') as file:
-        config = tomli.load(file)
+        config = tomllib.load(file)
     
     # set random state
     seed = config['script']['seed']
     rns = check_random_state(seed)
     
     # import xarray DataSet (NetCDF4 file)
-    dataset = xr.open_dataset(config['script']['input'])
+    dataset = open_dataset_lazy(config['script']['input'])
     shuffle_ds = dataset.copy()
     
     # output directory and experiment parameters
@@ -307,19 +866,27 @@ def main():
     replicates = config['script']['replicates']
     n_replicates = len(replicates) 
     max_processes = config['script']['max_processes']
-    
-    # define model grid search param
-    model_params = {
-        'rank': config['grid']['ranks'], 
-        'lambdas': config['grid']['lambdas'], 
-        'nonneg_modes': [config['params']['nonneg_modes']],
-        'tol': [config['params']['tol']], 
-        'n_iter_max': [config['params']['n_iter_max']], 
-        'n_initializations': [config['params']['n_initializations']]
+    # replicate subtensor storage format (zarr reads take no HDF5 lock)
+    use_zarr = config['script'].get('use_zarr', False)
+    rep_file_ext = 'zarr' if use_zarr else 'nc'
+
+    # model parameters constant across the grid search, shared with the
+    # workers once instead of duplicated into every grid cell
+    constant_params = {
+        'nonneg_modes': config['params']['nonneg_modes'],
+        'tol': config['params']['tol'],
+        'n_iter_max': config['params']['n_iter_max'],
+        'n_initializations': config['params']['n_initializations']
     }
-    param_grid = list(ParameterGrid(model_params))
-    # sort by lambda to make parallelization more efficient
-    param_grid = sorted(param_grid, key=lambda d: d['lambdas'][0])
+    # grid cells carry only the parameters that actually vary
+    param_grid = [
+        {'rank': rank, 'lambdas': lambdas}
+        for rank in config['grid']['ranks']
+        for lambdas in config['grid']['lambdas']
+    ]
+    # sort by rank then lambda, so each rank's lambda sweep can be
+    # warm-started from the previous lambda's solution
+    param_grid = sorted(param_grid, key=lambda d: (d['rank'], d['lambdas'][0]))
     
     # set up output data records and locations
     filepath_fit_data = base_dir / 'fitting_data.csv'
@@ -340,12 +907,26 @@ def main():
                      'mode0_factor_sparsity', 'sse', 'fms']
         )
         cv_results = []
-    
-    # assemble jobs
-    models = []
-    data_tensors = []
-    dirpaths_models = []
-    param_kwargs = []
+    # hashed set of comparisons already recorded, for O(1) resume checks
+    completed_comparisons = set(zip(
+        cv_df['bootstrap_id'], cv_df['rank'], cv_df['lambda'],
+        cv_df['modeled_replicate'], cv_df['comparison_replicate']
+    ))
+
+    # index fitted models already on disk with a single glob, rather than
+    # stat-ing every candidate filepath in the assembly loop
+    existing_fitted = set(
+        base_dir.glob('bootstrap*/replicate*/rank*/lambda*/fitted-model.h5')
+    )
+    # likewise index the saved replicate subtensors with one glob
+    existing_reps = set(
+        base_dir.glob(
+            'bootstrap*/replicate*/shuffled-replicate-*.{}'.format(rep_file_ext)
+        )
+    )
+
+    # assemble jobs: one lambda sweep per (bootstrap, replicate, rank)
+    sweeps = {}
     ledger = {}
     for boot_id in range(n_bootstraps):
         shuffle_seed = rns.randint(2**32)
@@ -360,7 +941,7 @@ def main():
             print('Importing DataSet discovered at:\n\t{}'.format(
                 filepath_shuffle_ds
             ), flush=True)
-            shuffle_ds = xr.open_dataset(filepath_shuffle_ds)
+            shuffle_ds = open_dataset_lazy(filepath_shuffle_ds)
         # make and save shuffled dataset if it doesn't exist
         else:
             print('Shuffling DataSet replicate labels', flush=True)
@@ -391,17 +972,15 @@ def main():
             if not path.is_dir():
                 path.mkdir(parents=True)
             # collect all filepaths
-            filepaths_reps[rep] = path / 'shuffled-replicate-{}.nc'.format(rep, rep)
+            filepaths_reps[rep] = path / 'shuffled-replicate-{}.{}'.format(rep, rep_file_ext)
         # check if all replicate dataarrays exist or not
-        all_reps_saved = np.all([filepaths_reps[f].is_file() for f in replicates])
-        # import replicate subtensors if the saved files exist
+        all_reps_saved = all(filepaths_reps[f] in existing_reps for f in replicates)
+        # use saved replicate subtensors if they exist (workers load them
+        # from disk themselves, so nothing is read here)
         if all_reps_saved:
-            print('Importing replicate DataArrays discovered at:\n{}'.format(
+            print('Using replicate DataArrays discovered at:\n{}'.format(
                 json.dumps({i: str(k) for i, k in filepaths_reps.items()}, indent=4)
             ), flush=True)
-            replicate_sets = {}
-            for rep in replicates:
-                replicate_sets[rep] = xr.open_dataarray(filepaths_reps[rep])
         # otherwise separate out replicate sets from shuffled tensor
         else:
             print('Separating shuffled replicate DataArrays', flush=True)
@@ -410,13 +989,10 @@ def main():
             )
             for rep in replicates:
                 # save shuffled replicate data
-                replicate_sets[rep].to_netcdf(filepaths_reps[rep])
+                save_tensor(replicate_sets[rep], filepaths_reps[rep])
         
         # fit grid search models to each replicate dataset
         for rep in replicates:
-            # pull out shuffled replicate data
-            tensor = replicate_sets[rep]
-            
             # instantiate models and define output filepaths
             for params in param_grid:
                 model_seed = rns.randint(2**32)
@@ -425,184 +1001,148 @@ def main():
                 )
                 filepath_fitted = model_dir / 'fitted-model.h5'
                 # don't re-fit any models that have already been fitted
-                if not filepath_fitted.is_file():
-                    # instantiate parameterized model
-                    models.append(SparseCP(**params, random_state=model_seed))
-                    data_tensors.append(tensor.data)
-                    dirpaths_models.append(model_dir)
-                    param_kwargs.append({'threads': 1, 'verbose': 0})
+                if filepath_fitted not in existing_fitted:
+                    # add model to this rank's lambda sweep (param_grid is
+                    # sorted, so models arrive in ascending lambda order)
+                    sweep_key = (boot_id, rep, params['rank'])
+                    if sweep_key not in sweeps:
+                        sweeps[sweep_key] = {
+                            'params': [],
+                            'seeds': [],
+                            # workers load the tensor themselves, once per
+                            # process, rather than receiving pickled copies
+                            'tensor_path': filepaths_reps[rep],
+                            'paths': [],
+                            'kwargs': []
+                        }
+                    sweeps[sweep_key]['params'].append(params)
+                    sweeps[sweep_key]['seeds'].append(model_seed)
+                    sweeps[sweep_key]['paths'].append(model_dir)
+                    sweeps[sweep_key]['kwargs'].append({'threads': 1, 'verbose': 0})
                     ledger[model_seed] = {
-                        'bootstrap': boot_id, 
-                        'replicate': rep, 
-                        'model_dir': model_dir, 
+                        'bootstrap': boot_id,
+                        'replicate': rep,
+                        'model_dir': model_dir,
                         'tensor_path': filepaths_reps[rep]
                     }
 
-    # run all assembled jobs in parallel
+    # run all assembled sweeps in parallel
     print('\nLaunching model fitting in parallel\n', flush=True)
     job_params = (
-        models, 
-        data_tensors, 
-        dirpaths_models, 
-        param_kwargs
+        [s['params'] for s in sweeps.values()],
+        [s['seeds'] for s in sweeps.values()],
+        [s['tensor_path'] for s in sweeps.values()],
+        [s['paths'] for s in sweeps.values()],
+        [s['kwargs'] for s in sweeps.values()]
     )
     executor = ProcessPoolExecutor(max_workers=max_processes)
-    fit_models = executor.map(fit_save_model, *job_params)
-        
-    # iterate through fitted model results
-    for model in fit_models:
-        
-        # calculate metrics
-        tensor = xr.open_dataarray(ledger[model.random_state]['tensor_path'])
-        rank = model.rank
-        lamb = model.lambdas[0]
-        best_init = model._best_cp_index
-        loss = model.loss_[-1]
-        cvg_iter = len(model.loss_)
-        sse = relative_sse(model.decomposition_, tensor)
-        degeneracy = degeneracy_score(model.decomposition_)
-        cc = core_consistency(model.decomposition_, tensor)
-        can_fms = [factor_match_score(model.decomposition_, c, consider_weights=False, allow_smaller_rank=True) for c in model.candidates_]
-        can_sse = [relative_sse(c, tensor) for c in model.candidates_]
-        
+    # chunk the sweep submissions so pickling overhead amortizes; the
+    # constant model parameters are bound once rather than per cell
+    fit_sweeps = executor.map(
+        partial(fit_lambda_sweep, constant_params=constant_params),
+        *job_params,
+        chunksize=max(1, len(sweeps) // (max_processes * 4))
+    )
+
+    # iterate through fit metrics as they stream back from the workers
+    for metrics in (m for sweep in fit_sweeps for m in sweep):
+
+        # look up which job these metrics belong to
+        job = ledger[metrics.pop('random_state')]
+
         # record metrics
-        fitting_results.append(
-            {
-                'datetime': datetime.datetime.now(), 
-                'bootstrap_id': ledger[model.random_state]['bootstrap'], 
-                'replicate': ledger[model.random_state]['replicate'], 
-                'rank': rank, 
-                'lambda': lamb, 
-                'best_init': best_init, 
-                'loss': loss, 
-                'convergence_iterations': cvg_iter, 
-                'sse': sse, 
-                'degeneracy': degeneracy, 
-                'core_consistency': cc, 
-                'candidate_fms': can_fms, 
-                'candidate_sse': can_sse
-            }
-        )
-        
+        record = {
+            'datetime': datetime.datetime.now(),
+            'bootstrap_id': job['bootstrap'],
+            'replicate': job['replicate'],
+            **metrics
+        }
+        fitting_results.append(record)
+
         # print some metrics
         print('bootstrap: {}, replicate: {}, rank:{}, lambda:{}, sse:{:.5}'.format(
-            ledger[model.random_state]['bootstrap'], 
-            ledger[model.random_state]['replicate'], 
-            rank, 
-            lamb, 
-            sse, 
+            job['bootstrap'],
+            job['replicate'],
+            metrics['rank'],
+            metrics['lambda'],
+            metrics['sse'],
         ), flush=True)
-    
-        # save data
-        fitting_df = pd.DataFrame(fitting_results)
-        fitting_df.to_csv(filepath_fit_data, index=False)
-    
-    # shut down executor
-    executor.shutdown()
 
+        # append new record to saved data
+        pd.DataFrame([record]).to_csv(
+            filepath_fit_data, mode='a', index=False,
+            header=not filepath_fit_data.is_file()
+        )
+    
     # collect cross validation results
     print('\nBeginning cross validataion calculations\n', flush=True)
+    # assemble comparison tasks not already recorded
+    cv_tasks = []
     for boot_id in range(n_bootstraps):
         # set path of bootstrap data
         boot_path = base_dir / 'bootstrap{}'.format(boot_id)
-        # read in shuffled replicate data
-        rep_data = {}
-        for rep in replicates:
-            rep_path = boot_path / 'replicate{}'.format(rep) 
-            rep_data[rep] = xr.open_dataarray(rep_path / 'shuffled-replicate-{}.nc'.format(rep))
+        # paths of shuffled replicate data
+        rep_paths = {
+            rep: boot_path / 'replicate{}'.format(rep) /
+                'shuffled-replicate-{}.{}'.format(rep, rep_file_ext)
+            for rep in replicates
+        }
         # iterate through all parameter combos
         for params in param_grid:
-            # get all the models
-            cps = {}
+            # paths of the fitted models
             expt_path = 'rank{}/lambda{}'.format(params['rank'], params['lambdas'][0])
-            for rep in replicates:
-                cp_path = boot_path / 'replicate{}'.format(rep) / expt_path
-                cps[rep] = load_cp_tensor(cp_path / 'fitted-model.h5')
+            cp_paths = {
+                rep: boot_path / 'replicate{}'.format(rep) / expt_path /
+                    'fitted-model.h5'
+                for rep in replicates
+            }
             for modeled_rep in replicates:
                 for comparison_rep in replicates:
-                    print_string = 'bootstrap: {}, rank: {}, lambda: {}, modeled: {}, comparison: {}'.format(
-                        boot_id, 
-                        params['rank'], 
-                        params['lambdas'][0], 
-                        modeled_rep, 
+                    # check if comparison has already been calculated
+                    comparison_key = (
+                        boot_id,
+                        params['rank'],
+                        params['lambdas'][0],
+                        modeled_rep,
                         comparison_rep
                     )
-                    # check if comparison has already been calculated
-                    record = cv_df.loc[(
-                        (cv_df['bootstrap_id'] == boot_id) & 
-                        (cv_df['rank'] == params['rank']) & 
-                        (cv_df['lambda'] == params['lambdas'][0]) & 
-                        (cv_df['modeled_replicate'] == modeled_rep) & 
-                        (cv_df['comparison_replicate'] == comparison_rep)
-                    )]
-                    if len(record) >= 1:
+                    if comparison_key in completed_comparisons:
                         print(
-                            'Pre-existing record found, ' + 
-                            'skipping following comparison:\n\t{}'.format(print_string), 
+                            'Pre-existing record found, ' +
+                            'skipping following comparison:\n\t' +
+                            'bootstrap: {}, rank: {}, lambda: {}, modeled: {}, comparison: {}'.format(
+                                *comparison_key
+                            ),
                             flush=True
                         )
                         continue
-                    else:
-                        print(print_string, flush=True)
-                    
-                    # find common samples
-                    subset_cps = {}
-                    if modeled_rep != comparison_rep:
-                        common_labels, idx_modeled, idx_comparison = select_common_indices(
-                            rep_data[modeled_rep], 
-                            rep_data[comparison_rep], 
-                            ['sample_id']
-                        )
-                        # get cp subsets
-                        subset_cps[modeled_rep] = subset_cp_tensor(
-                            cps[modeled_rep], 
-                            {2: idx_modeled}
-                        )
-                        subset_cps[comparison_rep] = subset_cp_tensor(
-                            cps[comparison_rep], 
-                            {2: idx_comparison}
-                        )
-                        # get comparison data
-                        comparison_data = rep_data[comparison_rep].sel(
-                            sample_id=common_labels
-                        )                        
-                    else:
-                        # cp subset is full model
-                        subset_cps[modeled_rep] = cps[modeled_rep]
-                        # comparison data is full replicate set
-                        comparison_data = rep_data[comparison_rep]
-                    
-                    # calculate fms & cosine similiary scores against other fit models
-                    if modeled_rep < comparison_rep:
-                        fms_cv = factor_match_score(
-                            subset_cps[modeled_rep], 
-                            subset_cps[comparison_rep], 
-                            consider_weights=False, 
-                            allow_smaller_rank=True
-                        )
-                    else:
-                        # skip redundant and self comparisons
-                        fms_cv = np.nan
-                    # calculate relative sse
-                    rel_sse = relative_sse(subset_cps[modeled_rep], comparison_data.data)
-                    # keep results
-                    cv_results.append(
-                        {
-                            'bootstrap_id': boot_id, 
-                            'rank': params['rank'], 
-                            'lambda': params['lambdas'][0], 
-                            'modeled_replicate': modeled_rep, 
-                            'comparison_replicate': comparison_rep, 
-                            'n_components': nonzero_components(cps[modeled_rep]), 
-                            'mode0_factor_sparsity': 
-                                1 - (cps[modeled_rep].factors[0] != 0.0).mean(axis=0).mean(), 
-                            'sse': rel_sse, 
-                            'fms': fms_cv, 
-                        }
+                    cv_tasks.append(
+                        (boot_id, params, modeled_rep, comparison_rep,
+                         rep_paths, cp_paths)
                     )
-        # store results in dataframe and save
-        cv_df = pd.DataFrame(cv_results)
-        cv_df.to_csv(filepath_cv_data, index=False)
+
+    # run comparisons in parallel, appending records as they complete
+    if cv_tasks:
+        for cv_record in executor.map(
+            compute_cv_record, *zip(*cv_tasks),
+            chunksize=max(1, len(cv_tasks) // (max_processes * 4))
+        ):
+            print('bootstrap: {}, rank: {}, lambda: {}, modeled: {}, comparison: {}, sse:{:.5}'.format(
+                cv_record['bootstrap_id'],
+                cv_record['rank'],
+                cv_record['lambda'],
+                cv_record['modeled_replicate'],
+                cv_record['comparison_replicate'],
+                cv_record['sse'],
+            ), flush=True)
+            cv_results.append(cv_record)
+            pd.DataFrame([cv_record]).to_csv(
+                filepath_cv_data, mode='a', index=False,
+                header=not filepath_cv_data.is_file()
+            )
+
+    # shut down executor
+    executor.shutdown()
 
 if __name__ == "__main__":
   main()